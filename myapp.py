@@ -1,10 +1,19 @@
 import streamlit as st
 import os
 import re
-from groq import Groq
+import textwrap
+import json
+import hashlib
+import asyncio
+import httpx
+import diskcache
+import tiktoken
+from groq import AsyncGroq, DefaultAsyncHttpxClient, NOT_GIVEN
 from langgraph.graph import StateGraph
+from langchain_core.runnables import RunnableConfig
 from typing import TypedDict, Optional, List
 from fpdf import FPDF
+from fpdf.enums import XPos, YPos
 
 # ---- Sidebar Configuration ----
 st.sidebar.title("Groq Cloud Settings")
@@ -18,13 +27,30 @@ st.sidebar.markdown(
 )
 transcript_file = st.sidebar.file_uploader("Upload Transcript", type=["txt"])
 
-# ---- Create Groq Client if API Key is provided ----
-if api_key.strip():
-    client = Groq(api_key=api_key)
-else:
+# ---- Require a Groq API Key ----
+if not api_key.strip():
     st.sidebar.warning("Please enter a valid Groq Cloud API key to use the app.")
     st.stop()
 
+# ---- Groq Client ----
+# The client is only created when a workflow actually runs, not on every
+# rerun. It can't be cached with st.cache_resource: its pooled connections
+# belong to the event loop that opened them, and each asyncio.run starts a
+# new loop.
+def create_client(api_key: str) -> AsyncGroq:
+    """Create an async Groq client that keeps connections alive between the workflow's LLM calls."""
+    return AsyncGroq(
+        api_key=api_key,
+        http_client=DefaultAsyncHttpxClient(
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=10, keepalive_expiry=60.0)
+        )
+    )
+
+async def run_with_client(operation, *args):
+    """Await a workflow operation with a Groq client scoped to the current event loop."""
+    async with create_client(api_key) as client:
+        return await operation(*args, client)
+
 # ---- Initialize Session State ----
 if 'qna_bank' not in st.session_state:
     st.session_state.qna_bank = []
@@ -38,6 +64,12 @@ if 'topic' not in st.session_state:
     st.session_state.topic = None
 if 'key_concepts' not in st.session_state:
     st.session_state.key_concepts = None
+if 'last_hash' not in st.session_state:
+    st.session_state.last_hash = None
+if 'quiz_submitted' not in st.session_state:
+    st.session_state.quiz_submitted = False
+if 'summarized_transcript' not in st.session_state:
+    st.session_state.summarized_transcript = None
 
 # ---- Define State Schema ----
 class QuizState(TypedDict):
@@ -49,99 +81,316 @@ class QuizState(TypedDict):
     questions: Optional[List[dict]]
 
 # ---- Markdown Cleaning Function for Study Notes ----
+_MD_HEADING = re.compile(r'(?m)^#{1,6}\s*')
+_MD_BOLD = re.compile(r'\*\*(.*?)\*\*')
+_MD_ITAL = re.compile(r'\*(.*?)\*')
+_MD_BULLET = re.compile(r'(?m)^[\-\+\*]\s+')
+
+@st.cache_data(max_entries=8)
 def clean_markdown(text: str) -> str:
     """Remove common Markdown formatting markers from text."""
-    text = re.sub(r'(?m)^#{1,6}\s*', '', text)
-    text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)
-    text = re.sub(r'\*(.*?)\*', r'\1', text)
-    text = re.sub(r'(?m)^[\-\+\*]\s+', '', text)
+    text = _MD_HEADING.sub('', text)
+    text = _MD_BOLD.sub(r'\1', text)
+    text = _MD_ITAL.sub(r'\1', text)
+    text = _MD_BULLET.sub('', text)
     return text
 
+# ---- JSON to Markdown Conversion ----
+def json_to_markdown(value, depth: int = 0) -> str:
+    """Render a JSON value from the LLM as Markdown: top-level keys become headings, nested values bullet lists."""
+    indent = "  " * max(depth - 1, 0)
+    if isinstance(value, dict):
+        lines = []
+        for key, item in value.items():
+            if depth == 0:
+                lines.append(f"### {key}")
+                lines.append(json_to_markdown(item, depth + 1))
+            elif isinstance(item, (dict, list)):
+                lines.append(f"{indent}- **{key}**")
+                lines.append(json_to_markdown(item, depth + 1))
+            else:
+                lines.append(f"{indent}- **{key}**: {item}")
+        return "\n".join(lines)
+    if isinstance(value, list):
+        lines = []
+        for item in value:
+            if isinstance(item, dict) and not any(isinstance(v, (dict, list)) for v in item.values()):
+                # e.g. {"term": ..., "explanation": ...} becomes one bullet
+                lines.append(f"{indent}- " + ": ".join(str(v) for v in item.values()))
+            elif isinstance(item, (dict, list)):
+                lines.append(json_to_markdown(item, depth + 1))
+            else:
+                lines.append(f"{indent}- {item}")
+        return "\n".join(lines)
+    return f"{indent}- {value}" if depth else str(value)
+
 # ---- PDF Conversion Function ----
+# Lines are pre-wrapped by character count so FPDF doesn't measure every glyph
+# to find line breaks; 90 characters of typical text fits the page width at 12pt.
+_PDF_WRAPPER = textwrap.TextWrapper(width=90, break_long_words=True)
+
+@st.cache_data(max_entries=8)
 def create_pdf(content: str, title: str = "Document") -> bytes:
     pdf = FPDF()
     pdf.add_page()
-    # Add a Unicode-capable version of Helvetica.
-    # Ensure "Helvetica.ttf" is available in the working directory or adjust the path accordingly.
-    pdf.add_font("Helvetica", "", "Helvetica.ttf", uni=True)
-    pdf.set_font("Helvetica", size=12)
-    pdf.cell(0, 10, txt=title, ln=1, align="C")
+    if content.isascii() and title.isascii():
+        # Plain ASCII renders with the built-in core font, skipping TTF subsetting.
+        pdf.set_font("helvetica", size=12)
+    else:
+        # Add a Unicode-capable version of Helvetica for non-ASCII text.
+        # Ensure "Helvetica.ttf" is available in the working directory or adjust the path accordingly.
+        pdf.add_font("HelveticaUnicode", "", "Helvetica.ttf")
+        pdf.set_font("HelveticaUnicode", size=12)
+    pdf.cell(0, 10, text=title, new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C")
     pdf.ln(10)
-    pdf.multi_cell(0, 10, content)
-    # Output PDF and encode using 'latin1'
-    pdf_output = pdf.output(dest="S").encode("latin1")
-    return pdf_output
+    for paragraph in content.split("\n"):
+        for line in _PDF_WRAPPER.wrap(paragraph) or [""]:
+            pdf.cell(0, 10, text=line, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+    # fpdf2 returns the document as a bytearray, no re-encoding needed
+    return bytes(pdf.output())
+
+# ---- Quiz Text Builder for PDF Export ----
+@st.cache_data(max_entries=8)
+def build_quiz_text(qna_tuple: tuple) -> str:
+    """Assemble the quiz PDF text from (question, options, answer, explanation) tuples, with options as (letter, text) pairs."""
+    return "".join(
+        f"Q{i+1}: {question}\n"
+        + "\n".join(f"{letter}) {text}" for letter, text in options)
+        + f"\nAnswer: {answer}\nExplanation: {explanation}\n\n"
+        for i, (question, options, answer, explanation) in enumerate(qna_tuple)
+    )
+
+# ---- Transcript Loading ----
+@st.cache_data(max_entries=8)
+def load_transcript(file_bytes: bytes) -> str:
+    """Decode the uploaded transcript once per distinct file content."""
+    return file_bytes.decode("utf-8")
+
+# ---- Transcript Pre-filter ----
+# Transcripts are often a single unbroken line, so filtering works on sentences.
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+|\n+')
+_LOW_SIGNAL = re.compile(
+    r'^(hi|hello|welcome|thanks|thank you|good (morning|afternoon|evening)|any questions|can everyone hear)\b'
+    r'|see (my|the) screen|audio is clear|waiting for (people|everyone) to join|(short|quick) break',
+    re.IGNORECASE
+)
+
+# tiktoken downloads its encoding file on first use; if that host is
+# unreachable, None is cached and prompts fall back to a character slice.
+@st.cache_resource
+def get_tokenizer():
+    """Load the tokenizer used to measure prompt size (GPT-4's encoding as a proxy for Llama's)."""
+    try:
+        return tiktoken.encoding_for_model("gpt-4")
+    except Exception:
+        return None
+
+def prefilter_transcript(text: str, max_tokens: int = 750, max_chars: int = 3000) -> str:
+    """Drop short and low-signal sentences, then keep the start of the rest up to a token budget (or `max_chars` without a tokenizer)."""
+    sentences = (sentence.strip() for sentence in _SENTENCE_SPLIT.split(text))
+    filtered = " ".join(
+        sentence for sentence in sentences
+        if len(sentence) > 20 and not _LOW_SIGNAL.search(sentence)
+    )
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        return filtered[:max_chars]
+    # A token is rarely more than 8 characters, so only the front of the text
+    # needs encoding rather than the whole transcript.
+    return tokenizer.decode(tokenizer.encode(filtered[:max_tokens * 8])[:max_tokens])
+
+# ---- LLM Response Cache ----
+class LLMCache:
+    """Disk-backed cache of LLM responses, keyed by a hash of the request parameters."""
+    def __init__(self, directory: str = ".groq_cache", ttl: int = 7 * 24 * 60 * 60):
+        self.cache = diskcache.Cache(directory)
+        self.ttl = ttl
+
+    @staticmethod
+    def make_key(**request) -> str:
+        payload = json.dumps(request, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        return self.cache.get(key)
+
+    def set(self, key: str, value: str) -> None:
+        """Store a response until the cache TTL expires."""
+        self.cache.set(key, value, expire=self.ttl)
+
+@st.cache_resource
+def get_llm_cache() -> LLMCache:
+    """Open the response cache once per process instead of on every rerun."""
+    return LLMCache()
+
+# ---- MCQ Parsing Pattern ----
+# Anchored on "Question:" and scanned once over the response with finditer;
+# each explanation runs up to the next "#####" separator or the end of text.
+# No field may contain "#####", so a malformed block can't swallow the next one.
+_MCQ_FIELD = r"((?:(?!#####).)+?)"
+MCQ_PATTERN = re.compile(
+    rf"Question:\s*{_MCQ_FIELD}\s*\n"
+    rf"\s*A\)\s*{_MCQ_FIELD}\s*\n"
+    rf"\s*B\)\s*{_MCQ_FIELD}\s*\n"
+    rf"\s*C\)\s*{_MCQ_FIELD}\s*\n"
+    rf"\s*D\)\s*{_MCQ_FIELD}\s*\n"
+    r"\s*Answer:\s*([A-D])\s*\n"
+    rf"\s*Explanation:\s*{_MCQ_FIELD}(?=\s*#####|\Z)",
+    re.DOTALL | re.IGNORECASE
+)
+
+def parse_mcqs(text: str):
+    """Parse all well-formed MCQs in `text`, returning them with the number of malformed blocks skipped."""
+    questions = []
+    skipped = 0
+    # Scan each "#####"-delimited segment on its own, so the result is the same
+    # whether the response arrives whole (from the cache) or streamed.
+    for segment in text.split("#####"):
+        found = 0
+        for match in MCQ_PATTERN.finditer(segment):
+            question, a, b, c, d, answer, explanation = [x.strip() for x in match.groups()]
+            questions.append({
+                "question": question,
+                "options": [("A", a), ("B", b), ("C", c), ("D", d)],
+                "answer": answer.upper(),
+                "explanation": explanation
+            })
+            found += 1
+        skipped += max(segment.lower().count("question:") - found, 0)
+    return questions, skipped
 
 # ---- AI Agent Calls ----
 class QuizAgents:
-    def _call_llm(self, prompt, system_message):
-        """Send request to GroqCloud API using the Groq Python SDK."""
+    def _llm_request(self, prompt, system_message, max_tokens=1500, response_format=None):
+        """Build the request parameters shared by the LLM calls and their cache key."""
+        request = {
+            "model": "llama-3.3-70b-versatile",
+            "system": system_message,
+            "prompt": prompt,
+            "temperature": 0.5,
+            "max_tokens": max_tokens,
+        }
+        if response_format:
+            request["response_format"] = response_format
+        return request
+
+    async def _call_llm(self, client, prompt, system_message, max_tokens=1500, response_format=None, validate=None):
+        """Send request to GroqCloud API using the async Groq Python SDK; new responses are cached only if they pass `validate`."""
+        request = self._llm_request(prompt, system_message, max_tokens, response_format)
+        llm_cache = get_llm_cache()
+        key = llm_cache.make_key(**request)
+        cached = llm_cache.get(key)
+        if cached is not None:
+            return cached
         try:
-            response = client.chat.completions.create(
+            response = await client.chat.completions.create(
                 messages=[
                     {"role": "system", "content": system_message},
                     {"role": "user", "content": prompt}
                 ],
-                model="llama-3.3-70b-versatile",
-                temperature=0.5,
-                max_tokens=1500
+                model=request["model"],
+                temperature=request["temperature"],
+                max_tokens=request["max_tokens"],
+                response_format=request.get("response_format", NOT_GIVEN)
             )
-            return response.choices[0].message.content
+            content = response.choices[0].message.content
+            if content and (validate is None or validate(content)):
+                llm_cache.set(key, content)
+            return content
         except Exception as e:
             st.error(f"API Error: {str(e)}")
             return None
 
-    def classify_topic(self, state: QuizState) -> QuizState:
-        """Determines the core topic of the transcript."""
-        transcription = state["transcription"]
-        system_msg = (
-            "Analyze the given transcript and determine its primary academic or technical subject. "
-            "Provide only the subject name, such as 'Machine Learning', 'Biology', 'Finance', etc."
-        )
-        topic = self._call_llm(transcription[:3000], system_msg)
-        if not topic:
-            st.error("Failed to classify topic. Please try again.")
+    async def _stream_llm(self, client, prompt, system_message, refresh=False, validate=None):
+        """Stream response tokens from GroqCloud as they are generated; a cached response is yielded whole unless `refresh` is set."""
+        request = self._llm_request(prompt, system_message)
+        llm_cache = get_llm_cache()
+        key = llm_cache.make_key(**request)
+        cached = None if refresh else llm_cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+        tokens = []
+        try:
+            stream = await client.chat.completions.create(
+                messages=[
+                    {"role": "system", "content": system_message},
+                    {"role": "user", "content": prompt}
+                ],
+                model=request["model"],
+                temperature=request["temperature"],
+                max_tokens=request["max_tokens"],
+                stream=True
+            )
+            async for chunk in stream:
+                token = chunk.choices[0].delta.content if chunk.choices else None
+                if token:
+                    tokens.append(token)
+                    yield token
+        except Exception as e:
+            # Tokens may already have been yielded, so stop the run rather than
+            # let the caller treat a truncated response as complete.
+            st.error(f"API Error: {str(e)}")
             st.stop()
-        state["topic"] = topic
-        return state
+        response = "".join(tokens)
+        if response and (validate is None or validate(response)):
+            llm_cache.set(key, response)
 
-    def extract_key_concepts(self, state: QuizState) -> QuizState:
-        """Extracts key concepts, methodologies, and important terms from the transcript."""
+    # Each node returns only the keys it produces, so that nodes running in
+    # parallel branches of the graph don't overwrite each other's updates.
+    # The Groq client is passed per run through the config, keeping the
+    # agents stateless so one compiled graph can be shared across sessions.
+    async def analyze_transcript(self, state: QuizState, config: RunnableConfig) -> dict:
+        """Classifies the topic, extracts key concepts and summarizes the transcript in a single request."""
         transcription = state["transcription"]
-        topic = state["topic"]
         system_msg = (
-            f"Extract key concepts, methodologies, technical terms, and important examples from the following {topic} lecture transcript. "
-            "Organize them into clear categories such as 'Key Concepts', 'Methodologies', 'Important Terms', and 'Examples'. "
-            "Provide concise explanations for each item where applicable. Ensure the output is well-structured and easy to follow."
-            "Ignore session logistics, greetings, general chatter, off-topic questions, student joining counts, session breaks, or unrelated discussions. "
+            "Analyze the given lecture transcript and respond with a JSON object with exactly these keys:\n"
+            "- \"topic\": the primary academic or technical subject of the transcript. "
+            "Provide only the subject name, such as 'Machine Learning', 'Biology', 'Finance', etc.\n"
+            "- \"key_concepts\": the key concepts, methodologies, technical terms, and important examples from the lecture, "
+            "organized into clear categories such as 'Key Concepts', 'Methodologies', 'Important Terms', and 'Examples', "
+            "with concise explanations for each item where applicable.\n"
+            "- \"summary\": a summary of the lecture ensuring that all key concepts are covered, "
+            "structured using clear headings such as 'Introduction', 'Key Concepts', 'Examples', and 'Conclusion', "
+            "including relevant definitions, explanations, and examples where applicable. "
+            "It should be concise, well-organized, and suitable for use as study notes.\n"
+            "The values of \"key_concepts\" and \"summary\" must be Markdown-formatted strings. "
+            "Ignore session logistics, greetings, general chatter, off-topic questions, student joining counts, session breaks, or unrelated discussions."
         )
-        key_concepts = self._call_llm(transcription[:3000], system_msg)
-        if not key_concepts:
-            st.error("Failed to extract key concepts. Please try again.")
+        analysis_text = await self._call_llm(
+            config["configurable"]["client"], prefilter_transcript(transcription), system_msg,
+            max_tokens=3000, response_format={"type": "json_object"},
+            validate=lambda text: self._parse_analysis(text) is not None
+        )
+        analysis = self._parse_analysis(analysis_text)
+        if analysis is None:
+            st.error("Failed to analyze the transcript. Please try again.")
             st.stop()
-        state["key_concepts"] = key_concepts
-        return state
+        return analysis
 
-    def summarize_transcript(self, state: QuizState) -> QuizState:
-        """Summarizes the lecture transcript with a focus on key educational details."""
-        transcription = state["transcription"]
-        topic = state["topic"]
-        key_concepts = state["key_concepts"]
-        system_msg = (
-            f"Summarize this {topic} lecture transcript, ensuring that all key concepts are covered. "
-            "Structure the summary using clear headings such as 'Introduction', 'Key Concepts', 'Examples', and 'Conclusion'. "
-            "Include relevant definitions, explanations, and examples where applicable. "
-            "Ignore session logistics, greetings, general chatter, off-topic questions, student joining counts, session breaks, or unrelated discussions. "
-            "Ensure the summary is concise, well-organized, and suitable for use as study notes."
+    @staticmethod
+    def _parse_analysis(analysis_text):
+        """Parse the combined analysis JSON into state updates, or return None if it is unusable."""
+        try:
+            analysis = json.loads(analysis_text) if analysis_text else None
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(analysis, dict):
+            return None
+        topic, key_concepts, summarized_text = (
+            analysis.get(field) for field in ("topic", "key_concepts", "summary")
         )
-        summarized_text = self._call_llm(transcription[:3000], system_msg)
-        if not summarized_text:
-            st.error("Failed to summarize the transcript. Please try again.")
-            st.stop()
-        state["summarized_transcript"] = summarized_text
-        return state
+        # Categorized sections often come back as nested objects or lists
+        # despite the prompt; render those as Markdown rather than failing.
+        key_concepts, summarized_text = (
+            json_to_markdown(value) if isinstance(value, (dict, list)) else value
+            for value in (key_concepts, summarized_text)
+        )
+        if not all(isinstance(value, str) and value.strip() for value in (topic, key_concepts, summarized_text)):
+            return None
+        return {"topic": topic.strip(), "key_concepts": key_concepts, "summarized_transcript": summarized_text}
 
-    def generate_study_notes(self, state: QuizState) -> QuizState:
+    async def generate_study_notes(self, state: QuizState, config: RunnableConfig) -> dict:
         """Generates structured, topic-based study notes with clear sections."""
         summarized_text = state["summarized_transcript"]
         system_msg = (
@@ -158,14 +407,20 @@ class QuizAgents:
             "Include practical examples, diagrams (if relevant), and detailed explanations to make the notes comprehensive and easy to follow. "
             "The notes should be suitable for studying purposes and help learners grasp the material effectively."
         )
-        study_notes = self._call_llm(summarized_text[:2000], system_msg)
+        # Render the notes incrementally while they stream in. They stay on
+        # screen while the questions finish; the Generate handler clears them
+        # once the workflow returns and the notes are displayed from session state.
+        placeholder = st.empty()
+        study_notes = ""
+        async for token in self._stream_llm(config["configurable"]["client"], summarized_text[:2000], system_msg):
+            study_notes += token
+            placeholder.markdown(study_notes)
         if not study_notes:
             st.error("Failed to generate study notes. Please try again.")
             st.stop()
-        state["study_notes"] = study_notes
-        return state
+        return {"study_notes": study_notes}
 
-    def question_generator(self, state: QuizState) -> QuizState:
+    async def question_generator(self, state: QuizState, config: RunnableConfig) -> dict:
         """Generates multiple-choice quiz questions based on the summarized transcript."""
         summarized_text = state["summarized_transcript"]
         system_msg = f"""
@@ -183,39 +438,39 @@ class QuizAgents:
     Ensure the questions cover a variety of topics and difficulty levels, including conceptual understanding, application-based scenarios, and problem-solving.
     avoid questions like what is the purpose of the lecture, what is the primary focus of the lecture in context to the course,  What is the purpose of using examples and comparisons between different techniques in the lecture, etc.
     """
-        questions_text = self._call_llm(summarized_text[:2000], system_msg)
-        blocks = questions_text.split("#####")
         parsed_questions = []
-        pattern = re.compile(
-            r"Question:\s*(.+?)\n"
-            r"A\)\s*(.+?)\n"
-            r"B\)\s*(.+?)\n"
-            r"C\)\s*(.+?)\n"
-            r"D\)\s*(.+?)\n"
-            r"Answer:\s*([A-D])\n"
-            r"Explanation:\s*(.+)",
-            re.DOTALL | re.IGNORECASE
-        )
-        for block in blocks:
-            block = block.strip()
-            if not block:
-                continue
-            match = pattern.search(block)
-            if match:
-                question, a, b, c, d, answer, explanation = [x.strip() for x in match.groups()]
-                parsed_questions.append({
-                    "question": question,
-                    "options": [f"A) {a}", f"B) {b}", f"C) {c}", f"D) {d}"],
-                    "answer": answer,
-                    "explanation": explanation
-                })
-            else:
-                st.warning(f"Skipping improperly formatted question block:\n{block}")
+        skipped = 0
+
+        def parse(text):
+            nonlocal skipped
+            questions, skipped_blocks = parse_mcqs(text)
+            parsed_questions.extend(questions)
+            skipped += skipped_blocks
+
+        # Parse each "#####"-delimited block as soon as its separator arrives
+        # instead of waiting for the whole response. A cached response arrives
+        # as a single token and goes through the same split.
+        progress = st.empty()
+        buffer = ""
+        async for token in self._stream_llm(
+            config["configurable"]["client"], summarized_text[:2000], system_msg,
+            refresh=config["configurable"].get("refresh", False),
+            validate=lambda text: bool(parse_mcqs(text)[0])
+        ):
+            buffer += token
+            if "#####" in buffer:
+                *segments, buffer = buffer.split("#####")
+                for segment in segments:
+                    parse(segment)
+                progress.caption(f"Generated {len(parsed_questions)} quiz questions...")
+        parse(buffer)
+        progress.empty()
+        if skipped:
+            st.warning(f"Skipped {skipped} improperly formatted question block(s).")
         if not parsed_questions:
             st.error("No valid quiz questions were generated. Please check the LLM response format.")
             st.stop()
-        state["questions"] = parsed_questions
-        return state
+        return {"questions": parsed_questions}
 
 # ---- LangGraph Workflow ----
 class QuizWorkflow:
@@ -223,34 +478,44 @@ class QuizWorkflow:
         self.agents = agents
         self.workflow = StateGraph(QuizState)
         # Add nodes in processing order
-        self.workflow.add_node("classify_topic", agents.classify_topic)
-        self.workflow.add_node("extract_key_concepts", agents.extract_key_concepts)
-        self.workflow.add_node("summarize_transcript", agents.summarize_transcript)
+        self.workflow.add_node("analyze_transcript", agents.analyze_transcript)
         self.workflow.add_node("generate_study_notes", agents.generate_study_notes)
         self.workflow.add_node("generate_questions", agents.question_generator)
-        # Build workflow chain
-        self.workflow.add_edge("classify_topic", "extract_key_concepts")
-        self.workflow.add_edge("extract_key_concepts", "summarize_transcript")
-        self.workflow.add_edge("summarize_transcript", "generate_study_notes")
-        self.workflow.add_edge("generate_study_notes", "generate_questions")
-        self.workflow.set_entry_point("classify_topic")
+        # Build workflow graph: study notes and questions only need the
+        # analysis, so they run concurrently.
+        self.workflow.add_edge("analyze_transcript", "generate_study_notes")
+        self.workflow.add_edge("analyze_transcript", "generate_questions")
+        self.workflow.set_entry_point("analyze_transcript")
+        self.workflow.set_finish_point("generate_study_notes")
         self.workflow.set_finish_point("generate_questions")
         self.chain = self.workflow.compile()
 
-    def run(self, transcription):
+    async def run(self, transcription, client):
         """Executes the full workflow on the provided transcription."""
         inputs = {"transcription": transcription}
-        result = self.chain.invoke(inputs)
+        result = await self.chain.ainvoke(inputs, config={"configurable": {"client": client}})
         if not result.get("questions"):
             st.error("Workflow failed to generate quiz questions. Please try again.")
             st.stop()
         return result
 
+    async def regenerate_questions(self, summarized_transcript, client):
+        """Generates a fresh set of quiz questions from an existing summary, skipping the earlier stages."""
+        state = {"summarized_transcript": summarized_transcript}
+        config = {"configurable": {"client": client, "refresh": True}}
+        result = await self.agents.question_generator(state, config)
+        return result["questions"]
+
+@st.cache_resource
+def get_workflow() -> QuizWorkflow:
+    """Build and compile the workflow graph once and share it across reruns and sessions."""
+    return QuizWorkflow(QuizAgents())
+
 # ---- Streamlit UI ----
 st.title("AI-Powered Quiz & Study Notes Generator")
 
 if transcript_file:
-    transcription = transcript_file.read().decode("utf-8")
+    transcription = load_transcript(transcript_file.getvalue())
 else:
     transcription = None
 
@@ -260,18 +525,42 @@ if transcription:
 
 if st.button("Generate Study Notes & Quiz"):
     if transcription:
-        with st.spinner("Processing..."):
-            st.write("Analyzing transcript & generating content...")
-            result = QuizWorkflow(QuizAgents()).run(transcription)
-            st.session_state.study_notes = result.get("study_notes", "")
-            st.session_state.qna_bank = result.get("questions", [])
-            st.session_state.user_answers = {}
-            st.session_state.show_quiz = False
-            st.session_state.topic = result.get("topic", "")
-            st.session_state.key_concepts = result.get("key_concepts", "")
+        transcript_hash = hashlib.blake2b(transcription.encode(), digest_size=16).hexdigest()
+        if st.session_state.last_hash == transcript_hash:
+            st.info("Study notes and quiz are already up to date for this transcript.")
+        else:
+            with st.spinner("Processing..."):
+                st.write("Analyzing transcript & generating content...")
+                # Live output from the workflow (streaming notes, quiz progress)
+                # renders into this area and is replaced by the final display.
+                live_output = st.empty()
+                with live_output.container():
+                    result = asyncio.run(run_with_client(get_workflow().run, transcription))
+                live_output.empty()
+                st.session_state.study_notes = result.get("study_notes", "")
+                st.session_state.qna_bank = result.get("questions", [])
+                st.session_state.user_answers = {}
+                st.session_state.show_quiz = False
+                st.session_state.quiz_submitted = False
+                st.session_state.topic = result.get("topic", "")
+                st.session_state.key_concepts = result.get("key_concepts", "")
+                st.session_state.summarized_transcript = result.get("summarized_transcript")
+                st.session_state.last_hash = transcript_hash
     else:
         st.error("Please upload a transcript file first.")
 
+# Reuse the stored summary to build a new quiz without re-running the analysis
+# and study notes stages.
+if st.session_state.summarized_transcript and st.button("Regenerate Quiz"):
+    with st.spinner("Generating a new quiz..."):
+        st.session_state.qna_bank = asyncio.run(
+            run_with_client(get_workflow().regenerate_questions, st.session_state.summarized_transcript)
+        )
+        st.session_state.user_answers = {}
+        st.session_state.quiz_submitted = False
+        for i in range(len(st.session_state.qna_bank)):
+            st.session_state.pop(f"q_{i}", None)
+
 # ---- Display Study Notes ----
 if st.session_state.study_notes:
     st.subheader("📚 Generated Study Notes")
@@ -292,29 +581,36 @@ if st.session_state.study_notes:
 # ---- Display Quiz ----
 if st.session_state.show_quiz and st.session_state.qna_bank:
     st.subheader("📝 Generated Quiz")
-    for i, qna in enumerate(st.session_state.qna_bank):
-        with st.container():
-            st.markdown(f"**{i+1}. {qna['question']}**")
-            st.session_state.user_answers[i] = st.radio(
-                f"Select an option for Q{i+1}",
-                qna["options"],
-                index=None,
-                key=f"q_{i}"
-            )
-            with st.expander("See explanation"):
-                st.markdown(f"**Correct Answer:** {qna['answer']}")
-                st.text_area("Explanation", qna['explanation'], height=100, key=f"exp_{i}")
-    if st.button("Submit Quiz"):
+    # Answers are collected in a form, so selecting an option doesn't rerun
+    # the script; everything is submitted together.
+    with st.form("quiz_form"):
+        for i, qna in enumerate(st.session_state.qna_bank):
+            with st.container():
+                st.markdown(f"**{i+1}. {qna['question']}**")
+                st.session_state.user_answers[i] = st.radio(
+                    f"Select an option for Q{i+1}",
+                    qna["options"],
+                    format_func=lambda option: f"{option[0]}) {option[1]}",
+                    index=None,
+                    key=f"q_{i}"
+                )
+        if st.form_submit_button("Submit Quiz"):
+            st.session_state.quiz_submitted = True
+    if st.session_state.quiz_submitted:
         total_score = sum(
             1 for i, qna in enumerate(st.session_state.qna_bank)
-            if st.session_state.user_answers.get(i, "").startswith(qna["answer"])
+            if (st.session_state.user_answers.get(i) or (None,))[0] == qna["answer"]
         )
         st.success(f"Your total score: {total_score}/{len(st.session_state.qna_bank)}")
-    quiz_text = ""
-    for i, qna in enumerate(st.session_state.qna_bank):
-        quiz_text += f"Q{i+1}: {qna['question']}\n"
-        quiz_text += "\n".join(qna["options"]) + "\n"
-        quiz_text += f"Answer: {qna['answer']}\n"
-        quiz_text += f"Explanation: {qna['explanation']}\n\n"
+        for i, qna in enumerate(st.session_state.qna_bank):
+            with st.expander(f"See explanation for Q{i+1}"):
+                st.markdown(f"**Correct Answer:** {qna['answer']}")
+                st.text_area("Explanation", qna['explanation'], height=100, key=f"exp_{i}")
+    # Quiz text and PDF are memoized on content, so answering questions
+    # doesn't rebuild them on every rerun.
+    quiz_text = build_quiz_text(tuple(
+        (qna["question"], tuple(qna["options"]), qna["answer"], qna["explanation"])
+        for qna in st.session_state.qna_bank
+    ))
     pdf_quiz = create_pdf(quiz_text, "Quiz")
     st.download_button("Download Quiz (PDF)", data=pdf_quiz, file_name="generated_quiz.pdf", mime="application/pdf")
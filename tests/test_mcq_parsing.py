@@ -0,0 +1,48 @@
+from myapp import parse_mcqs
+
+
+def mcq_block(n, answer="A", d_line=True):
+    lines = [
+        f"Question: Q{n}?",
+        f"A) a{n}",
+        f"B) b{n}",
+        f"C) c{n}",
+    ]
+    if d_line:
+        lines.append(f"D) d{n}")
+    lines += [f"Answer: {answer}", f"Explanation: e{n}."]
+    return "\n".join(lines)
+
+
+def test_parses_blocks_separated_by_hashes():
+    text = "\n#####\n".join(mcq_block(n) for n in range(1, 4))
+    questions, skipped = parse_mcqs(text)
+    assert [q["question"] for q in questions] == ["Q1?", "Q2?", "Q3?"]
+    assert questions[0]["options"] == [("A", "a1"), ("B", "b1"), ("C", "c1"), ("D", "d1")]
+    assert questions[2]["explanation"] == "e3."
+    assert skipped == 0
+
+
+def test_separator_on_explanation_line_is_not_kept():
+    questions, _ = parse_mcqs(mcq_block(1) + " #####")
+    assert questions[0]["explanation"] == "e1."
+
+
+def test_malformed_block_does_not_swallow_next_block():
+    text = "\n#####\n".join(
+        [mcq_block(1, answer="B", d_line=False)] + [mcq_block(n) for n in range(2, 5)]
+    )
+    questions, skipped = parse_mcqs(text)
+    assert [q["question"] for q in questions] == ["Q2?", "Q3?", "Q4?"]
+    assert questions[0]["options"][2] == ("C", "c2")
+    assert skipped == 1
+
+
+def test_whole_response_parses_like_streamed_segments():
+    text = "\n#####\n".join(
+        [mcq_block(1, answer="B", d_line=False)] + [mcq_block(n) for n in range(2, 5)]
+    )
+    streamed = []
+    for segment in text.split("#####"):
+        streamed.extend(parse_mcqs(segment)[0])
+    assert parse_mcqs(text)[0] == streamed